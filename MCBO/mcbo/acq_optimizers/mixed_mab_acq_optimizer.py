@@ -173,7 +173,8 @@ class MixedMabAcqOptimizer(AcqOptimizerBase):
                                               i_ in
                                               range(len(self.input_constraints))]
 
-            x_cat = self.mab_search_space.transform(self.mab.suggest(n_suggestions))
+            self.mab.suggest(n_suggestions)
+            x_cat = self.mab.last_x_next_transf
 
             x_cat_unique, x_cat_counts = torch.unique(x_cat, return_counts=True, dim=0)
 
@@ -200,7 +201,8 @@ class MixedMabAcqOptimizer(AcqOptimizerBase):
                                                                 acq_evaluate_kwargs, tr_manager)))
 
         elif self.search_space.num_nominal > 0:
-            x_next = self.mab_search_space.transform(self.mab.suggest(n_suggestions))
+            self.mab.suggest(n_suggestions)
+            x_next = self.mab.last_x_next_transf
 
         return x_next
 
@@ -355,9 +357,9 @@ class MixedMabAcqOptimizer(AcqOptimizerBase):
         if len(data_buffer) < n_init:
             return
         elif len(data_buffer) == n_init and self.mab_search_space.num_dims > 0:
-            x_cat_init = self.mab_search_space.inverse_transform(data_buffer.x[:, self.cat_dims])
+            x_cat_init_transf = data_buffer.x[:, self.cat_dims]
             y_init = data_buffer.y.cpu().numpy()
-            self.mab.initialize(x_cat_init, y_init)
+            self.mab.initialize(x=None, y=y_init, x_transf=x_cat_init_transf)
         elif self.mab_search_space.num_dims > 0:
             x_cat = self.mab_search_space.inverse_transform(x[:, self.cat_dims])
             y = y.cpu().numpy()
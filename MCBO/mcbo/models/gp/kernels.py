@@ -224,15 +224,13 @@ class SubStringKernel(Kernel):
         self.alphabet_size = alphabet_size
         self.normalize = normalize
 
-        self.tril = torch.triu(torch.ones((self.maxlen, self.maxlen), dtype=torch.double), diagonal=1)
-        self.exp = torch.ones(self.maxlen, self.maxlen, dtype=torch.int)
+        # Registered as (non-persistent) buffers so that they follow the device of the kernel when the model is moved
+        self.register_buffer('tril', torch.triu(torch.ones((self.maxlen, self.maxlen), dtype=torch.double),
+                                                diagonal=1), persistent=False)
+        exp = torch.ones(self.maxlen, self.maxlen, dtype=torch.int)
         for i in range(self.maxlen - 1):
-            self.exp[i, i + 1:] = torch.arange(self.maxlen - i - 1)
-
-    def to(self, device: Optional[torch.device] = None, dtype: Optional[torch.dtype] = None):
-        self.tril.to(device=device, dtype=dtype)
-        self.exp.to(device=device)
-        return super().to(device=device, dtype=dtype)
+            exp[i, i + 1:] = torch.arange(self.maxlen - i - 1)
+        self.register_buffer('exp', exp, persistent=False)
 
     def K_diag(self, x: torch.Tensor):
         r"""
@@ -9,9 +9,12 @@
 
 from typing import Optional, List, Callable, Dict, Union
 
+import warnings
+
 import numpy as np
 import pandas as pd
 import torch
+from numba import njit, prange
 from pymoo.config import Config
 
 from mcbo.utils.plot_resource_utils import COLORS_SNS_10, get_color
@@ -35,10 +38,73 @@ from mcbo.optimizers.optimizer_base import OptimizerNotBO
 from mcbo.search_space.search_space import SearchSpace
 from mcbo.trust_region.tr_manager_base import TrManagerBase
 from mcbo.trust_region.tr_utils import sample_numeric_and_nominal_within_tr
-from mcbo.utils.distance_metrics import hamming_distance
+from mcbo.utils.discrete_vars_utils import row_key, row_keys, rows_from_keys
 from mcbo.utils.pymoo_utils import PymooProblem, GenericRepair
 
 
+@njit(cache=True)
+def _mutate_row_nb(x: np.ndarray, i: int, lb: np.ndarray, num_cats: np.ndarray, center: np.ndarray,
+                   radius: int) -> None:
+    """
+    Inplace mutation of one randomly chosen dimension of row i of x. Mutations leading to points at a hamming
+    distance greater than radius from center are rejected and sampled again.
+    """
+    num_dims = x.shape[1]
+    while True:
+        idx = np.random.randint(0, num_dims)
+        # Sample among the n - 1 other categories by shifting the draws that are not below the current one
+        new_cat = lb[idx] + np.random.randint(0, num_cats[idx] - 1)
+        if new_cat >= x[i, idx]:
+            new_cat += 1
+
+        if radius < num_dims:
+            dist = 0
+            for d in range(num_dims):
+                value = new_cat if d == idx else x[i, d]
+                if value != center[d]:
+                    dist += 1
+            if dist > radius:
+                continue
+
+        x[i, idx] = new_cat
+        break
+
+
+@njit(cache=True)
+def _mutate_nb(x: np.ndarray, lb: np.ndarray, num_cats: np.ndarray, center: np.ndarray, radius: int,
+               seed: int) -> None:
+    """
+    Inplace mutation of each row of x (see `_mutate_row_nb`).
+
+    Numba has its own random state, so it is seeded from numpy's global random state by the caller for the
+    results to be reproducible.
+    """
+    np.random.seed(seed)
+    for i in range(x.shape[0]):
+        _mutate_row_nb(x, i, lb, num_cats, center, radius)
+
+
+@njit(cache=True, parallel=True)
+def _mutate_parallel_nb(x: np.ndarray, lb: np.ndarray, num_cats: np.ndarray, center: np.ndarray, radius: int,
+                        seeds: np.ndarray) -> None:
+    """
+    Inplace mutation of each row of x (see `_mutate_row_nb`), rows being processed in parallel.
+
+    Each thread has its own random state, hence the random state is seeded with seeds[i] before mutating row i for
+    the results not to depend on the scheduling of the rows.
+    """
+    for i in prange(x.shape[0]):
+        np.random.seed(seeds[i])
+        _mutate_row_nb(x, i, lb, num_cats, center, radius)
+
+
+def _hamming_to_center_batch(x: np.ndarray, center: np.ndarray) -> np.ndarray:
+    """
+    Hamming distances between each row of x and center (exact comparison, as all variables are nominal)
+    """
+    return (x != center).sum(axis=1)
+
+
 class PymooMixedVariableGaWithRepair(GeneticAlgorithm):
 
     def __init__(self,
@@ -144,8 +210,6 @@ class PymooGeneticAlgorithm(OptimizerNotBO):
 
     def method_suggest(self, n_suggestions: int = 1) -> pd.DataFrame:
 
-        x_next = pd.DataFrame(index=range(n_suggestions), columns=self.search_space.df_col_names, dtype=float)
-
         if len(self._x_queue) == 0:
             # ask the algorithm for the next solution to be evaluated
             self._pymoo_pop = self._pymoo_ga.ask()
@@ -157,8 +221,8 @@ class PymooGeneticAlgorithm(OptimizerNotBO):
                 'n_suggestions is larger then the number of remaining samples in the current population. '
                 'To avoid this, ensure that pop_size is a multiple of n_suggestions.')
 
-        x_next.iloc[: n_suggestions] = self._x_queue.iloc[: n_suggestions]
-        self._x_queue = self._x_queue.drop([i for i in range(n_suggestions)]).reset_index(drop=True)
+        x_next = self._x_queue.iloc[:n_suggestions].reset_index(drop=True)
+        self._x_queue = self._x_queue.iloc[n_suggestions:].reset_index(drop=True)
 
         return x_next
 
@@ -313,27 +377,45 @@ class CategoricalGeneticAlgorithm(OptimizerNotBO):
         assert self.num_parents >= self.num_elite, \
             "\n The number of parents must be greater than the number of elite samples"
 
-        # Storage for the population
-        self.x_pop = torch.zeros((0, self.search_space.num_dims), dtype=self.dtype)
-        self.y_pop = torch.zeros((0, 1), dtype=self.dtype)
+        self.lb = self.search_space.nominal_lb
+        self.ub = self.search_space.nominal_ub
 
-        # Initialising variables that will store elite samples
-        self.x_elite = None
-        self.y_elite = None
+        # Lookup tables of the first category and of the number of categories of each variable used for mutations
+        self._cat_lb = np.asarray(self.lb, dtype=np.int64)
+        self._num_cats = np.asarray(self.ub, dtype=np.int64) - self._cat_lb + 1
+
+        # All variables are nominal, so the genotypes are stored as integers (self.dtype is used for the y values)
+        self.cat_dtype = torch.int16 if max(self.ub) <= torch.iinfo(torch.int16).max else torch.int32
 
-        # If there is a trust region manager, sample the initial population within a trust region of the centre
+        # Storage for the population: preallocated buffers filled up to self._pop_cursor (see `x_pop` and `y_pop`)
+        self._x_pop = torch.empty((self.pop_size, self.search_space.num_dims), dtype=self.cat_dtype)
+        self._y_pop = torch.empty((self.pop_size, 1), dtype=self.dtype)
+        self._pop_cursor = 0
 
-        self.x_queue = self.sample_input_valid_points(n_points=self.pop_size,
-                                                      point_sampler=self.get_tr_point_sampler())
+        self._observed_keys = set()
+
+        # Scratch buffers reused by every generation (all their rows are overwritten before being read)
+        self._scratch_parents = torch.empty((self.num_parents, self.search_space.num_dims), dtype=self.cat_dtype)
+        self._scratch_pop = torch.empty((self.pop_size, self.search_space.num_dims), dtype=self.cat_dtype)
+
+        # Initialising variables that will store elite samples (see `x_elite`)
+        self._x_elite = None
+        self.y_elite = None
+
+        # If there is a trust region manager, sample the initial population within a trust region of the centre,
+        # the centre itself being the first point of the population
         if self.tr_manager is not None:
-            self.x_queue.iloc[0:1] = self.search_space.inverse_transform(self.tr_center.unsqueeze(0))
+            x_in_tr = self.sample_input_valid_points(n_points=self.pop_size - 1,
+                                                     point_sampler=self.get_tr_point_sampler())
+            self.x_queue = pd.concat([self.search_space.inverse_transform(self.tr_center.unsqueeze(0)), x_in_tr],
+                                     ignore_index=True)
+        else:
+            self.x_queue = self.sample_input_valid_points(n_points=self.pop_size,
+                                                          point_sampler=self.get_tr_point_sampler())
 
         self.map_to_canonical = self.search_space.nominal_dims
         self.map_to_original = [self.map_to_canonical.index(i) for i in range(len(self.map_to_canonical))]
 
-        self.lb = self.search_space.nominal_lb
-        self.ub = self.search_space.nominal_ub
-
     def get_tr_point_sampler(self) -> Callable[[int], pd.DataFrame]:
         """
         Returns a function taking a number n_points as input and that returns a dataframe containing n_points sampled
@@ -375,11 +457,11 @@ class CategoricalGeneticAlgorithm(OptimizerNotBO):
 
         # Add data to all previously observed data
         if self.store_observations or (not self.allow_repeating_suggestions):
-            self.data_buffer.append(x.clone(), y.clone())
+            self.data_buffer.append(x, y)
+            self._observed_keys.update(row_keys(x))
 
         # Add data to current trust region data
-        self.x_pop = torch.cat((self.x_pop, x.clone()), axis=0)
-        self.y_pop = torch.cat((self.y_pop, y.clone()), axis=0)
+        self._append_to_pop(x=x, y=y)
 
         # update best fx
         self.update_best(x_transf=x, y=y)
@@ -390,8 +472,8 @@ class CategoricalGeneticAlgorithm(OptimizerNotBO):
     def restart(self):
         self._restart()
 
-        self.x_pop = torch.zeros((0, self.search_space.num_dims), dtype=self.dtype)
-        self.y_pop = torch.zeros((0, 1), dtype=self.dtype)
+        self._pop_cursor = 0
+        self._observed_keys = set()
 
         self.x_queue = self.sample_input_valid_points(
             n_points=self.pop_size,
@@ -401,32 +483,74 @@ class CategoricalGeneticAlgorithm(OptimizerNotBO):
     def method_suggest(self, n_suggestions: int = 1) -> pd.DataFrame:
         assert n_suggestions <= self.pop_size
 
-        idx = 0
+        # Take the points block-wise from the current population (and from new generations if it is exhausted)
+        x_next = []
         n_remaining = n_suggestions
-        x_next = pd.DataFrame(index=range(n_suggestions), columns=self.search_space.df_col_names, dtype=float)
+        while n_remaining:
+            if len(self.x_queue) == 0:
+                self._generate_new_population()
 
-        # Get points from current population
-        if n_remaining and len(self.x_queue):
             n = min(n_remaining, len(self.x_queue))
-            x_next.iloc[idx: idx + n] = self.x_queue.iloc[idx: idx + n]
-            self.x_queue = self.x_queue.drop(self.x_queue.index[[i for i in range(idx, idx + n)]]).reset_index(
-                drop=True)
+            x_next.append(self.x_queue.iloc[:n])
+            self.x_queue = self.x_queue.iloc[n:].reset_index(drop=True)
 
-            idx += n
             n_remaining -= n
 
-        while n_remaining:
-            self._generate_new_population()
+        if len(x_next) == 1:
+            x_next = x_next[0].reset_index(drop=True)
+        else:
+            x_next = pd.concat(x_next, ignore_index=True)
 
-            n = min(n_remaining, len(self.x_queue))
-            x_next.iloc[idx: idx + n] = self.x_queue.iloc[idx: idx + n]
-            self.x_queue = self.x_queue.drop(self.x_queue.index[[i for i in range(idx, idx + n)]]).reset_index(
-                drop=True)
+        return x_next
 
-            idx += n
-            n_remaining -= n
+    @property
+    def x_pop(self) -> torch.Tensor:
+        """
+        Points of the current population observed so far (in transformed space, with dtype self.dtype)
+        """
+        return self._x_pop[:self._pop_cursor].to(self.dtype)
 
-        return x_next
+    @property
+    def y_pop(self) -> torch.Tensor:
+        """
+        Values of the points of the current population observed so far
+        """
+        return self._y_pop[:self._pop_cursor]
+
+    @property
+    def x_elite(self) -> Optional[torch.Tensor]:
+        """
+        Elite points (in transformed space, with dtype self.dtype)
+        """
+        return None if self._x_elite is None else self._x_elite.to(self.dtype)
+
+    @property
+    def batch_size(self) -> int:
+        """
+        Number of points remaining in the current population (or size of a new population if it is exhausted)
+        """
+        return len(self.x_queue) if len(self.x_queue) > 0 else self.pop_size
+
+    def suggest_batch(self, n_suggestions: Optional[int] = None) -> pd.DataFrame:
+        """
+        Suggest several points at once, by default all the points remaining in the current population. As a
+        generation only depends on the observations of the previous one, the points of a batch can be evaluated in
+        parallel before being observed together (master-slave evaluation), e.g.
+
+            with ProcessPoolExecutor() as executor:
+                x_next = optimizer.suggest_batch()
+                y_next = np.vstack(list(executor.map(task, [x_next.iloc[i:i + 1] for i in range(len(x_next))])))
+                optimizer.observe(x_next, y_next)
+
+        Args:
+            n_suggestions: number of points to suggest (defaults to `self.batch_size`)
+
+        Returns:
+            dataframe of suggested points.
+        """
+        if n_suggestions is None:
+            n_suggestions = self.batch_size
+        return self.suggest(n_suggestions)
 
     def method_observe(self, x: pd.DataFrame, y: np.ndarray) -> None:
 
@@ -440,20 +564,38 @@ class CategoricalGeneticAlgorithm(OptimizerNotBO):
         # Add data to all previously observed data
         if self.store_observations or (not self.allow_repeating_suggestions):
             self.data_buffer.append(x_transf, y)
+            self._observed_keys.update(row_keys(x_transf))
 
         # Add data to current population
-        self.x_pop = torch.cat((self.x_pop, x_transf.clone()), axis=0)
-        self.y_pop = torch.cat((self.y_pop, y.clone()), axis=0)
+        self._append_to_pop(x=x_transf, y=y)
 
         # update best fx
         self.update_best(x_transf=x_transf, y=y)
 
+    def _append_to_pop(self, x: torch.Tensor, y: torch.Tensor) -> None:
+        """
+        Write x and y in the population buffers, growing them if more than pop_size points were observed
+        """
+        end = self._pop_cursor + len(x)
+        if end > len(self._x_pop):
+            capacity = max(end, 2 * len(self._x_pop))
+            x_pop = torch.empty((capacity, self.search_space.num_dims), dtype=self._x_pop.dtype)
+            y_pop = torch.empty((capacity, 1), dtype=self._y_pop.dtype)
+            x_pop[:self._pop_cursor] = self._x_pop[:self._pop_cursor]
+            y_pop[:self._pop_cursor] = self._y_pop[:self._pop_cursor]
+            self._x_pop, self._y_pop = x_pop, y_pop
+
+        self._x_pop[self._pop_cursor:end] = x
+        self._y_pop[self._pop_cursor:end] = y
+        self._pop_cursor = end
+
     def _generate_new_population(self):
 
         # Sort the current population
-        indices = self.y_pop.flatten().argsort()
-        x_sorted = self.x_pop[indices]
-        y_sorted = self.y_pop[indices].flatten()
+        y_pop = self._y_pop[:self._pop_cursor]
+        indices = y_pop.flatten().argsort()
+        x_sorted = self._x_pop[indices]
+        y_sorted = y_pop[indices].flatten()
 
         # Normalise the objective function
         min_y = y_sorted[0]
@@ -461,7 +603,7 @@ class CategoricalGeneticAlgorithm(OptimizerNotBO):
             norm_y = y_sorted + abs(min_y)
 
         else:
-            norm_y = y_sorted.clone()
+            norm_y = y_sorted
 
         max_y = norm_y.max()
         norm_y = max_y - norm_y + 1
@@ -471,127 +613,198 @@ class CategoricalGeneticAlgorithm(OptimizerNotBO):
         prob = norm_y / sum_norm_y
         cum_prob = prob.cumsum(dim=0)
 
-        if (self.x_elite is None) and (self.y_elite is None):
-            self.x_elite = x_sorted[:self.num_elite].clone()
-            self.y_elite = y_sorted[:self.num_elite].clone().view(-1, 1)
+        if (self._x_elite is None) and (self.y_elite is None):
+            self._x_elite = x_sorted[:self.num_elite]
+            self.y_elite = y_sorted[:self.num_elite].view(-1, 1)
 
         else:
-            x_elite = torch.cat((self.x_elite.clone(), x_sorted[:self.num_elite].clone()))
-            y_elite = torch.cat((self.y_elite.clone(), y_sorted[:self.num_elite].clone().view(-1, 1)))
-            indices = np.argsort(y_elite.flatten())
-            self.x_elite = x_elite[indices[:self.num_elite]]
-            self.y_elite = y_elite[indices[:self.num_elite]]
+            x_elite = torch.cat((self._x_elite, x_sorted[:self.num_elite]))
+            y_elite = torch.cat((self.y_elite, y_sorted[:self.num_elite].view(-1, 1)))
+            _, indices = torch.topk(y_elite.flatten(), k=self.num_elite, largest=False)
+            self._x_elite = x_elite[indices]
+            self.y_elite = y_elite[indices]
 
         # Select parents
-        parents = torch.full((self.num_parents, self.search_space.num_dims), fill_value=torch.nan, dtype=self.dtype)
+        parents = self._scratch_parents
 
         # First, append the best performing samples to the list of parents
-        parents[:self.num_elite] = self.x_elite
+        parents[:self.num_elite] = self._x_elite
 
         # Then append random samples to the list of parents. The probability of a sample being picked is
         # proportional to the fitness of a sample
-        for k in range(self.num_elite, self.num_parents):
-            index = np.searchsorted(cum_prob, np.random.random())
-            assert index < len(x_sorted), (index, cum_prob)
-            parents[k] = x_sorted[index].clone()
+        indices = np.searchsorted(cum_prob.numpy(), np.random.random(self.num_parents - self.num_elite))
+        assert np.all(indices < len(x_sorted)), (indices, cum_prob)
+        parents[self.num_elite:] = x_sorted[torch.from_numpy(indices)]
 
         # New population
-        pop = torch.full((self.pop_size, self.search_space.num_dims), fill_value=torch.nan, dtype=self.dtype)
-
-        # Second, perform crossover with the previously determined subset of all the parents
-        # for k in range(self.num_elite, self.population_size, 2):
-        for k in range(0, self.pop_size, 2):
-            def point_sampler(n_points: int) -> pd.DataFrame:
-                assert n_points <= 2, n_points
-                r1 = np.random.randint(0, self.num_parents)
-                r2 = np.random.randint(0, self.num_parents)
-                pvar1 = parents[r1].clone()
-                pvar2 = parents[r2].clone()
-
-                # Constraint satisfaction with rejection sampling
-                # constraints_satisfied = False
-                # while not constraints_satisfied:
-                ch1, ch2 = self._crossover(pvar1, pvar2)
-                ch1, ch2 = ch1.unsqueeze(0), ch2.unsqueeze(0)
-
-                _ch1, _ch2 = None, None
-
-                # Mutate child 1
-                done = False
-                counter = 0
-                x_observed = None
-                if not self.allow_repeating_suggestions:
-                    x_observed = self.data_buffer.x
-                while not done:
-                    _ch1 = self._mutate(ch1)
-                    # Check if sample is already present in pop
-                    if torch.logical_not((_ch1 == pop).all(axis=1)).all():
-                        # Check if the sample was observed before
-                        if not self.allow_repeating_suggestions:
-                            if torch.logical_not((_ch1 == x_observed).all(axis=1)).all():
-                                done = True
-                        else:
-                            if torch.logical_not((_ch1 == self.x_elite).all(axis=1)).all():
-                                done = True
-                    counter += 1
-
-                    # If not possible to generate a sample that has not been observed before, sample a random point
-                    if not done and counter == 100:
-                        _ch1 = self.search_space.transform(
-                            self.sample_input_valid_points(n_points=1,
-                                                           point_sampler=self.get_tr_point_sampler()))
-                        if not self.allow_repeating_suggestions:
-                            while torch.logical_not((_ch1 == x_observed).all(axis=1)).all():
-                                _ch1 = self.search_space.transform(
-                                    self.sample_input_valid_points(n_points=1,
-                                                                   point_sampler=self.get_tr_point_sampler()))
-                        done = True
-
-                # Mutate child 2
-                done = False
-                counter = 0
-                while not done:
-                    _ch2 = self._mutate(ch2)
-                    # Check if sample is already present in X_queue or in X_elites
+        pop = self._scratch_pop
+
+        # If (almost) all the points of the trust region were already observed, avoiding repeated suggestions would
+        # make the rejection loops below spin, so repeated suggestions are exceptionally allowed for this generation
+        # (the volume can exceed the float range, so the comparison is done with integers)
+        space_exhausted = False
+        if not self.allow_repeating_suggestions and 10 * len(self._observed_keys) > 9 * self._tr_volume_estimate() \
+                and 10 * self._num_observed_in_tr() > 9 * self._tr_volume_estimate():
+            space_exhausted = True
+            warnings.warn('Almost all the points of the search space (or of the trust region) have been observed, '
+                          'allowing repeated suggestions for this generation')
+        allow_repeating_suggestions = self.allow_repeating_suggestions or space_exhausted
+        max_tries = 1 if space_exhausted else 100
+
+        # Hash the rows against which children are checked once, so that each check is a O(1) set lookup
+        pop_seen = set()
+        elite_seen = set(row_keys(self._x_elite))
+        observed_seen = None
+        if not allow_repeating_suggestions:
+            observed_seen = self._observed_keys
+
+        def sample_random_point() -> torch.Tensor:
+            # Random valid point in the trust region. When repeated suggestions are not allowed, points that were
+            # observed before are rejected, but only up to max_tries times after which a repeated point is accepted
+            # (all the valid points of the trust region may already have been observed)
+            x = self.search_space.transform(
+                self.sample_input_valid_points(n_points=1, point_sampler=self.get_tr_point_sampler()))
+            n_tries = 1
+            while not allow_repeating_suggestions and row_key(x) in observed_seen and n_tries < 100:
+                x = self.search_space.transform(
+                    self.sample_input_valid_points(n_points=1, point_sampler=self.get_tr_point_sampler()))
+                n_tries += 1
+            return x
+
+        # Generate the children of a random pair of parents, rejecting children that were already seen
+        def point_sampler(n_points: int) -> pd.DataFrame:
+            assert n_points <= 2, n_points
+            r1 = np.random.randint(0, self.num_parents)
+            r2 = np.random.randint(0, self.num_parents)
+
+            # Constraint satisfaction with rejection sampling
+            # constraints_satisfied = False
+            # while not constraints_satisfied:
+            ch1, ch2 = self._crossover(parents[r1], parents[r2])
+            ch1, ch2 = ch1.unsqueeze(0), ch2.unsqueeze(0)
+
+            _ch1, _ch2 = None, None
+
+            # Mutate child 1
+            done = False
+            counter = 0
+            while not done:
+                _ch1 = self._mutate(ch1)
+                key = row_key(_ch1)
+                # Check if sample is already present in pop
+                if key not in pop_seen:
                     # Check if the sample was observed before
-                    if not self.allow_repeating_suggestions:
-                        if torch.logical_not((_ch2 == x_observed).all(axis=1)).all():
+                    if not allow_repeating_suggestions:
+                        if key not in observed_seen:
                             done = True
                     else:
-                        if torch.logical_not((_ch2 == self.x_elite).all(axis=1)).all():
+                        if key not in elite_seen:
                             done = True
-                    counter += 1
-
-                    # If not possible to generate a sample that has not been observed before, perform crossover again
-                    if not done and counter == 100:
-                        _ch2 = self.search_space.transform(
-                            self.sample_input_valid_points(n_points=1,
-                                                           point_sampler=self.get_tr_point_sampler()))
-                        if not self.allow_repeating_suggestions:
-                            while torch.logical_not((_ch2 == x_observed).all(axis=1)).all():
-                                _ch2 = self.search_space.transform(
-                                    self.sample_input_valid_points(n_points=1,
-                                                                   point_sampler=self.get_tr_point_sampler()))
+                counter += 1
+
+                # If not possible to generate a sample that has not been observed before, sample a random point
+                if not done and counter == max_tries:
+                    _ch1 = sample_random_point()
+                    done = True
+
+            # Mutate child 2
+            done = False
+            counter = 0
+            while not done:
+                _ch2 = self._mutate(ch2)
+                key = row_key(_ch2)
+                # Check if sample is already present in X_queue or in X_elites
+                # Check if the sample was observed before
+                if not allow_repeating_suggestions:
+                    if key not in observed_seen:
                         done = True
-                points = self.search_space.sample(num_samples=n_points)
-                cands = self.search_space.inverse_transform(torch.cat([_ch1, _ch2]))
-                if n_points == 2:
-                    points = cands
-                elif n_points == 1:
-                    points.iloc[0:1] = cands.iloc[np.random.randint(0, 2)]
-
-                return points
+                else:
+                    if key not in elite_seen:
+                        done = True
+                counter += 1
+
+                # If not possible to generate a sample that has not been observed before, perform crossover again
+                if not done and counter == max_tries:
+                    _ch2 = sample_random_point()
+                    done = True
+            points = self.search_space.sample(num_samples=n_points)
+            cands = self.search_space.inverse_transform(torch.cat([_ch1.to(self.dtype), _ch2.to(self.dtype)]))
+            if n_points == 2:
+                points = cands
+            elif n_points == 1:
+                points.iloc[0:1] = cands.iloc[np.random.randint(0, 2)]
+
+            return points
+
+        # Second, perform crossover with the previously determined subset of all the parents. All children are first
+        # generated at once, mutating them in parallel without rejection
+        pairs = np.random.randint(0, self.num_parents, size=(self.pop_size // 2, 2))
+        for k, (r1, r2) in zip(range(0, self.pop_size, 2), pairs):
+            pop[k], pop[k + 1] = self._crossover(parents[r1], parents[r2])
+        pop[:] = self._mutate(pop, parallel=True)
+
+        if self.input_constraints is not None and len(self.input_constraints) > 0:
+            valid = np.all(self.input_eval_from_transfx(transf_x=pop.to(self.dtype)), axis=1)
+        else:
+            valid = np.ones(self.pop_size, dtype=bool)
+
+        # Then the pairs containing a child that is invalid, duplicated in pop (all occurrences but the first one) or
+        # previously observed (or elite) are generated again with rejection sampling
+        _, inverse = torch.unique(pop, dim=0, return_inverse=True)
+        rows = torch.arange(self.pop_size)
+        first_occurrence = torch.full((int(inverse.max()) + 1,), self.pop_size, dtype=torch.long).scatter_reduce(
+            0, inverse, rows, reduce='amin')
+        duplicated = (first_occurrence[inverse] != rows).numpy()
+
+        excluded_seen = elite_seen if allow_repeating_suggestions else observed_seen
+        keys = row_keys(pop)
+        if space_exhausted:
+            accepted = valid
+        else:
+            accepted = valid & ~duplicated & np.array([key not in excluded_seen for key in keys])
+        accepted_pairs = accepted.reshape(-1, 2).all(axis=1)
+        pop_seen.update(key for key, is_accepted in zip(keys, np.repeat(accepted_pairs, 2)) if is_accepted)
 
+        for k in 2 * np.nonzero(~accepted_pairs)[0]:
             pop[k:k + 2] = self.search_space.transform(
                 self.sample_input_valid_points(n_points=2, point_sampler=point_sampler)
             )
-        self.x_queue = self.search_space.inverse_transform(pop)
+            pop_seen.update(row_keys(pop[k:k + 2]))
+
+        self.x_queue = self.search_space.inverse_transform(pop.to(self.dtype))
 
-        self.x_pop = torch.zeros((0, self.search_space.num_dims), dtype=self.dtype)
-        self.y_pop = torch.zeros((0, 1), dtype=self.dtype)
+        self._pop_cursor = 0
 
         return
 
+    def _tr_volume_estimate(self) -> int:
+        """
+        Number of points within the trust region (or in the whole search space if there is no trust region), i.e.
+        sum_{k <= radius} of the number of points at Hamming distance k from the centre.
+        """
+        num_other_cats = [int(n) - 1 for n in self._num_cats]
+        if self.tr_manager is None:
+            return int(np.prod([n + 1 for n in num_other_cats], dtype=object))
+
+        radius = min(int(self.tr_manager.get_nominal_radius()), len(num_other_cats))
+        # n_at_dist[k] = number of points at Hamming distance k from the centre (elementary symmetric polynomials)
+        n_at_dist = [1] + [0] * radius
+        for n in num_other_cats:
+            for k in range(radius, 0, -1):
+                n_at_dist[k] += n_at_dist[k - 1] * n
+        return sum(n_at_dist)
+
+    def _num_observed_in_tr(self) -> int:
+        """
+        Number of distinct observed points that are within the trust region (all of them if there is no trust region)
+        """
+        if self.tr_manager is None or len(self._observed_keys) == 0:
+            return len(self._observed_keys)
+
+        observed = rows_from_keys(self._observed_keys, num_dims=self.search_space.num_dims)
+        dist = (observed != self.tr_center.numpy().astype(np.int32)).sum(axis=1)
+        return int((dist <= int(self.tr_manager.get_nominal_radius())).sum())
+
     def _crossover(self, x1: torch.Tensor, x2: torch.Tensor) -> (torch.Tensor, torch.Tensor):
         assert self.search_space.num_nominal == self.search_space.num_dims, \
             'Current crossover can\'t handle permutations'
@@ -606,22 +819,11 @@ class CategoricalGeneticAlgorithm(OptimizerNotBO):
             x1_[:idx] = x2[:idx]
             x2_[:idx] = x1[:idx]
 
-            d_x1 = hamming_distance(self.tr_center.unsqueeze(0), x1_.unsqueeze(0), False)[0]
-            d_x2 = hamming_distance(self.tr_center.unsqueeze(0), x2_.unsqueeze(0), False)[0]
+            d_x1, d_x2 = _hamming_to_center_batch(torch.stack((x1_, x2_)).numpy(), self.tr_center.numpy())
 
-            if d_x1 > self.tr_manager.get_nominal_radius():
-                # Project x1_ back to the trust region
-                mask = x1_ != self.tr_center
-                indices = np.random.choice([i for i, x in enumerate(mask) if x],
-                                           size=d_x1.item() - self.tr_manager.get_nominal_radius(), replace=False)
-                x1_[indices] = self.tr_center[indices]
-
-            if d_x2 > self.tr_manager.get_nominal_radius():
-                # Project x2_ back to the trust region
-                mask = x2_ != self.tr_center
-                indices = np.random.choice([i for i, x in enumerate(mask) if x],
-                                           size=d_x2.item() - self.tr_manager.get_nominal_radius(), replace=False)
-                x2_[indices] = self.tr_center[indices]
+            # Project the children back to the trust region
+            self._project_to_tr(x1_, d_x1)
+            self._project_to_tr(x2_, d_x2)
 
         else:
             # starts from 1 and end at num_dims - 1 to always perform a crossover
@@ -632,33 +834,37 @@ class CategoricalGeneticAlgorithm(OptimizerNotBO):
 
         return x1_, x2_
 
-    def _mutate(self, x: torch.Tensor) -> torch.Tensor:
+    def _project_to_tr(self, x: torch.Tensor, dist: int) -> None:
+        """
+        Inplace projection of x, at hamming distance dist from the trust region centre, back to the trust region by
+        resetting randomly chosen dimensions to the value of the centre
+        """
+        radius = self.tr_manager.get_nominal_radius()
+        if dist > radius:
+            diff_indices = torch.nonzero(x != self.tr_center).flatten().numpy()
+            indices = np.random.choice(diff_indices, size=int(dist - radius), replace=False)
+            x[indices] = self.tr_center[indices].to(x.dtype)
+
+    def _mutate(self, x: torch.Tensor, parallel: bool = False) -> torch.Tensor:
         assert self.search_space.num_nominal == self.search_space.num_dims, \
             'Current mutate can\'t handle permutations'
         assert x.ndim == 2, (x.shape, self.map_to_canonical)
-        x_ = x.clone()[:, self.map_to_canonical]
+        # Indexing copies x, so x_ can be mutated inplace
+        x_ = x[:, self.map_to_canonical]
 
         if self.tr_manager is not None:
-
-            for i in range(len(x)):
-                done = False
-                while not done:
-                    cand = x_[i].clone()
-                    idx = np.random.randint(low=0, high=self.search_space.num_dims)
-                    categories = np.array(
-                        [j for j in range(int(self.lb[idx]), int(self.ub[idx]) + 1) if j != x[i, idx]])
-                    cand[idx] = np.random.choice(categories)
-                    dist_to_center = hamming_distance(self.tr_center.unsqueeze(0), cand.unsqueeze(0), False)
-                    if dist_to_center <= self.tr_manager.radii['nominal']:
-                        done = True
-                        x_[i] = cand
-
+            center = self.tr_center.numpy()
+            radius = int(self.tr_manager.radii['nominal'])
         else:
+            # A radius of num_dims never rejects a mutation
+            center = np.zeros(self.search_space.num_dims)
+            radius = self.search_space.num_dims
 
-            for i in range(len(x)):
-                idx = np.random.randint(low=0, high=self.search_space.num_dims)
-                categories = np.array([j for j in range(int(self.lb[idx]), int(self.ub[idx]) + 1) if j != x[i, idx]])
-                x_[i, idx] = np.random.choice(categories)
+        if parallel:
+            _mutate_parallel_nb(x_.numpy(), self._cat_lb, self._num_cats, center, radius,
+                                np.random.randint(2 ** 31, size=len(x_)))
+        else:
+            _mutate_nb(x_.numpy(), self._cat_lb, self._num_cats, center, radius, np.random.randint(2 ** 31))
 
         x_ = x_[:, self.map_to_original]
 
@@ -673,6 +879,10 @@ class GeneticAlgorithm(OptimizerNotBO):
     https://pymoo.org/customization/mixed.html). On purely combinatorial problems, the elitist GA algorithm can
     sometimes outperform the Mixed Variable GA from pymoo by an order of magnitude. However, at the same time it can be
     approximately 50% slower.
+
+    The black-box evaluations of a population are independent, so they can be farmed out to parallel workers: on
+    nominal search spaces, `suggest_batch` returns all the points remaining in the current population, and `observe`
+    accepts the whole batch of evaluations at once.
     """
     color_1: str = get_color(ind=8, color_palette=COLORS_SNS_10)
 
@@ -758,6 +968,17 @@ class GeneticAlgorithm(OptimizerNotBO):
     def method_suggest(self, n_suggestions: int = 1) -> pd.DataFrame:
         return self.backend_ga.method_suggest(n_suggestions)
 
+    def suggest_batch(self, n_suggestions: Optional[int] = None) -> pd.DataFrame:
+        """
+        Suggest several points at once to evaluate them in parallel (see `CategoricalGeneticAlgorithm.suggest_batch`).
+        Only supported when the search space contains only nominal variables.
+        """
+        assert isinstance(self.backend_ga, CategoricalGeneticAlgorithm), \
+            'suggest_batch is only supported by the categorical Genetic Algorithm'
+        if n_suggestions is None:
+            n_suggestions = self.backend_ga.batch_size
+        return self.suggest(n_suggestions)
+
     def method_observe(self, x: pd.DataFrame, y: np.ndarray) -> None:
         self.backend_ga.observe(x=x, y=y)
         self._best_x = self.backend_ga._best_x
@@ -7,6 +7,7 @@
 # WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
 # PARTICULAR PURPOSE. See the MIT License for more details.
 import warnings
+from collections import Counter
 from typing import Optional, List, Callable, Dict, Union
 
 import numpy as np
@@ -18,6 +19,7 @@ from mcbo.search_space import SearchSpace
 from mcbo.trust_region.tr_manager_base import TrManagerBase
 from mcbo.trust_region.tr_utils import sample_numeric_and_nominal_within_tr
 from mcbo.utils.dependant_rounding import DepRound
+from mcbo.utils.discrete_vars_utils import row_key, row_keys
 from mcbo.utils.distance_metrics import hamming_distance
 from mcbo.utils.plot_resource_utils import COLORS_SNS_10, get_color
 
@@ -72,16 +74,23 @@ class MultiArmedBandit(OptimizerNotBO):
 
         self.best_ube = 2 * max_n_iter / 3  # Upper bound estimate
 
-        self.gamma = []
-        for n_cats in self.n_cats:
-            if n_cats > batch_size:
-                self.gamma.append(np.sqrt(n_cats * np.log(n_cats / batch_size) / (
-                        (np.e - 1) * batch_size * self.best_ube)))
-            else:
-                self.gamma.append(np.sqrt(n_cats * np.log(n_cats) / ((np.e - 1) * self.best_ube)))
+        self.gamma = self.get_gamma()
 
         self.log_weights = [np.zeros(C) for C in self.n_cats]
         self.prob_dist = None
+        self.prob_cdf = None
+
+        self._observed_keys = set()
+
+        # Extrema of all the values stored in the data buffer, updated whenever the buffer is appended to
+        self._y_min = np.inf
+        self._y_max = - np.inf
+
+        # Best reward (negated value) observed with each category of each variable, updated along with the buffer
+        self._cat_rewards = None
+
+        # Last suggestions in transformed space, so that callers working with tensors do not need to transform them
+        self.last_x_next_transf = None
 
         if fixed_tr_manager is not None:
             assert 'nominal' in fixed_tr_manager.radii, 'Trust Region manager must contain a radius ' \
@@ -94,6 +103,8 @@ class MultiArmedBandit(OptimizerNotBO):
         self.fixed_tr_centre_nominal_dims = fixed_tr_centre_nominal_dims
         self.tr_center = None if fixed_tr_manager is None else fixed_tr_manager.center[
             self.fixed_tr_centre_nominal_dims].unsqueeze(0)
+        # With a single nominal variable, the nominal radius is always 1 so no point can be outside the trust region
+        self._skip_tr_projection = search_space.num_dims == search_space.num_nominal <= 1
 
         super(MultiArmedBandit, self).__init__(
             search_space=search_space,
@@ -104,6 +115,16 @@ class MultiArmedBandit(OptimizerNotBO):
             out_upper_constr_vals=out_upper_constr_vals
         )
 
+    def get_gamma(self) -> np.ndarray:
+        """
+        Exploration rate of each variable
+        """
+        n_cats = np.array(self.n_cats, dtype=float)
+        larger_than_batch = n_cats > self.batch_size
+        batch_factor = np.where(larger_than_batch, self.batch_size, 1)
+        log_arg = np.where(larger_than_batch, n_cats / self.batch_size, n_cats)
+        return np.sqrt(n_cats * np.log(log_arg) / ((np.e - 1) * batch_factor * self.best_ube))
+
     def update_fixed_tr_manager(self, fixed_tr_manager: Optional[TrManagerBase]):
         assert self.fixed_tr_centre_nominal_dims is not None
         self.tr_manager = fixed_tr_manager
@@ -115,16 +136,13 @@ class MultiArmedBandit(OptimizerNotBO):
         self.update_prob_dist()
 
         def mab_point_sampler(n_points: int) -> pd.DataFrame:
-            sample_points = torch.zeros((n_points, self.search_space.num_dims), dtype=self.dtype)
-            # Sample all the categorical variables
+            # Sample all the categorical variables at once
+            sample_points = self.sample_from_prob_dist(n_points=n_points)
             for _j, _num_cat in enumerate(self.n_cats):
-                # draw a batch here
+                # draw a batch of distinct categories here
                 if 1 < n_points < _num_cat:
                     _ht = DepRound(self.prob_dist[_j], k=n_points)
-                else:
-                    _ht = np.random.choice(_num_cat, n_points, p=self.prob_dist[_j])
-                # ht_batch_list size: len(self.C_list) x B
-                sample_points[:, _j] = torch.tensor(_ht[:], dtype=self.dtype)
+                    sample_points[:, _j] = torch.tensor(_ht, dtype=self.dtype)
             return self.search_space.inverse_transform(x=sample_points)
 
         x_next = self.search_space.transform(
@@ -132,67 +150,66 @@ class MultiArmedBandit(OptimizerNotBO):
         )
 
         # Project back all point to the trust region centre
-        if self.tr_manager is not None:
+        if self.tr_manager is not None and not self._skip_tr_projection:
+            radius = self.tr_manager.get_nominal_radius()
             hamming_distances = hamming_distance(x_next, self.tr_center, normalize=False)
 
-            for sample_idx, distance in enumerate(hamming_distances):
-                if distance > self.tr_manager.get_nominal_radius():
-                    # Project x back to the trust region
-                    is_valid = False
-                    n_trials = 0
-                    while not is_valid and n_trials < 3:
-                        candidate_proj = x_next[sample_idx].clone()
-                        mask = candidate_proj != self.tr_center[0]
-                        indices = np.random.choice(np.arange(len(mask))[mask],
-                                                   size=distance.item() - self.tr_manager.get_nominal_radius(),
-                                                   replace=False)
-                        candidate_proj[indices] = self.tr_center[0][indices]
-                        if np.all(self.input_eval_from_transfx(transf_x=candidate_proj)):
-                            x_next[sample_idx] = candidate_proj
-                            is_valid = True
-                        n_trials += 1
-                    if not is_valid:
-                        # sample a valid point in the TR directly
-                        point_sampler = lambda n_points: self.search_space.inverse_transform(
-                            sample_numeric_and_nominal_within_tr(x_centre=self.tr_center,
-                                                                 search_space=self.search_space,
-                                                                 tr_manager=self.tr_manager,
-                                                                 n_points=n_points,
-                                                                 numeric_dims=[],
-                                                                 discrete_choices=[],
-                                                                 max_n_perturb_num=0,
-                                                                 model=None,
-                                                                 return_numeric_bounds=False)
-                        )
-                        x_next[sample_idx] = self.search_space.transform(
-                            self.sample_input_valid_points(n_points=1, point_sampler=point_sampler))[0]
+            # Project all the samples outside of the trust region back to it at once, trying again (up to 3 times)
+            # only for the projections that do not satisfy the input constraints
+            to_project = torch.nonzero(hamming_distances > radius, as_tuple=True)[0]
+            n_trials = 0
+            while len(to_project) > 0 and n_trials < 3:
+                candidates_proj = self._project_to_tr(x=x_next[to_project], radius=radius)
+                is_valid = torch.from_numpy(np.all(self.input_eval_from_transfx(transf_x=candidates_proj), axis=1))
+                x_next[to_project[is_valid]] = candidates_proj[is_valid]
+                to_project = to_project[~is_valid]
+                n_trials += 1
+
+            for sample_idx in to_project.tolist():
+                # sample a valid point in the TR directly
+                point_sampler = lambda n_points: self.search_space.inverse_transform(
+                    sample_numeric_and_nominal_within_tr(x_centre=self.tr_center,
+                                                         search_space=self.search_space,
+                                                         tr_manager=self.tr_manager,
+                                                         n_points=n_points,
+                                                         numeric_dims=[],
+                                                         discrete_choices=[],
+                                                         max_n_perturb_num=0,
+                                                         model=None,
+                                                         return_numeric_bounds=False)
+                )
+                x_next[sample_idx] = self.search_space.transform(
+                    self.sample_input_valid_points(n_points=1, point_sampler=point_sampler))[0]
 
-        # Eliminate suggestions that have already been observed and all duplicates in the current batch
+        # Eliminate suggestions that have already been observed and all duplicates in the current batch. The number of
+        # occurrences of each point in the batch is kept up to date as the points get resampled
+        batch_counts = Counter(row_keys(x_next))
         for sample_idx in range(n_suggestions):
             tol = 0
             seen = self.was_sample_seen(
-                x_next=x_next, sample_idx=sample_idx
+                x_next=x_next, sample_idx=sample_idx, batch_counts=batch_counts
             )
 
             while seen:
+                batch_counts[row_key(x_next[sample_idx])] -= 1
+
                 # Resample
-                for j, num_cat in enumerate(self.n_cats):
-                    ht = np.random.choice(num_cat, 1, p=self.prob_dist[j])
-                    x_next[sample_idx, j] = torch.tensor(ht[:], dtype=self.dtype)
+                x_next[sample_idx] = self.sample_from_prob_dist(n_points=1)[0]
 
                 # Project back all point to the trust region centre
-                if self.tr_manager is not None:
-                    dist = hamming_distance(x_next[sample_idx:sample_idx + 1], self.tr_center, normalize=False)
-                    if dist.item() > self.tr_manager.get_nominal_radius():
+                if self.tr_manager is not None and not self._skip_tr_projection:
+                    # The mask of the differing dimensions gives both the distance and the dimensions to project
+                    mask = x_next[sample_idx] != self.tr_center[0]
+                    dist = int(mask.sum())
+                    if dist > radius:
                         # Project x back to the trust region
-                        mask = x_next[sample_idx] != self.tr_center[0]
-                        indices = np.random.choice([i for i, x in enumerate(mask) if x],
-                                                   size=dist.item() - self.tr_manager.get_nominal_radius(),
-                                                   replace=False)
+                        indices = np.random.choice(torch.nonzero(mask, as_tuple=True)[0].numpy(),
+                                                   size=int(dist - radius), replace=False)
                         x_next[sample_idx][indices] = self.tr_center[0][indices]
 
+                batch_counts[row_key(x_next[sample_idx])] += 1
                 seen = self.was_sample_seen(
-                    x_next=x_next, sample_idx=sample_idx
+                    x_next=x_next, sample_idx=sample_idx, batch_counts=batch_counts
                 )
                 tol += 1
 
@@ -216,30 +233,66 @@ class MultiArmedBandit(OptimizerNotBO):
                         )
                     else:
                         point_sampler = self.search_space.sample
+                    batch_counts[row_key(x_next[sample_idx])] -= 1
                     x_next[sample_idx] = self.search_space.transform(
                         self.sample_input_valid_points(n_points=1, point_sampler=point_sampler))[0]
+                    batch_counts[row_key(x_next[sample_idx])] += 1
 
                     seen = False  # Needed to prevent infinite loop
 
-        return self.search_space.inverse_transform(x_next)
+        self.last_x_next_transf = x_next
 
-    def was_sample_seen(self, x_next, sample_idx) -> bool:
+        return self.search_space.inverse_transform(x_next)
 
+    def _project_to_tr(self, x: torch.Tensor, radius: int) -> torch.Tensor:
+        """
+        Project points that are outside of the trust region back to its border, by setting the dimensions in which
+        they differ from the centre back to the value of the centre, except for `radius` of them chosen at random
+        """
+        tr_center = self.tr_center.to(x.dtype)
+        diff = x != tr_center
+        # Random ranks of the differing dimensions of each point (the other dimensions are ranked last)
+        scores = torch.from_numpy(np.random.random(diff.shape))
+        scores[~diff] = 2
+        ranks = scores.argsort(dim=1).argsort(dim=1)
+        n_reset = diff.sum(dim=1, keepdim=True) - int(radius)
+        rows, cols = torch.nonzero(ranks < n_reset, as_tuple=True)
+        x_proj = x.clone()
+        x_proj.index_put_((rows, cols), tr_center[0, cols])
+        return x_proj
+
+    def was_sample_seen(self, x_next, sample_idx, batch_counts: Dict[bytes, int]) -> bool:
+        """
+        Check whether x_next[sample_idx] is duplicated in the batch x_next or was previously observed. batch_counts
+        should map the key (see `row_key`) of each point of x_next to its number of occurrences.
+        """
         seen = False
 
-        if len(x_next) > 1:
-            # Check if current sample is already in the batch
-            if (x_next[sample_idx:sample_idx + 1] == torch.cat((x_next[:sample_idx], x_next[sample_idx + 1:]))).all(
-                    dim=1).any():
-                seen = True
+        # Check if current sample is already in the batch
+        if batch_counts[row_key(x_next[sample_idx])] > 1:
+            seen = True
 
         # If the black-box is not noisy, check if the current sample was previously observed
-        if (not seen) and (not self.noisy_black_box) and (x_next[sample_idx:sample_idx + 1] == self.data_buffer.x).all(
-                dim=1).any():
+        if (not seen) and (not self.noisy_black_box) and row_key(x_next[sample_idx]) in self._observed_keys:
             seen = True
 
         return seen
 
+    def _update_buffer_stats(self, x: torch.Tensor, y: torch.Tensor) -> None:
+        """
+        Update the statistics of the data buffer with the points that were just appended to it
+        """
+        self._y_min = min(self._y_min, y.min().item())
+        self._y_max = max(self._y_max, y.max().item())
+
+        if self._cat_rewards is None:
+            self._cat_rewards = [torch.full((num_cats,), -np.inf, dtype=self.dtype) for num_cats in self.n_cats]
+        # In MAB, we aim to maximise the reward. Comb Opt optimizers minimize reward, hence, take negative of bb values
+        neg_y_row_max = (- y).max(dim=1).values.to(self.dtype)
+        x_cats = x.to(torch.long)
+        for dim_dix, cat_rewards in enumerate(self._cat_rewards):
+            cat_rewards.scatter_reduce_(0, x_cats[:, dim_dix], neg_y_row_max, reduce='amax')
+
     def method_observe(self, x: pd.DataFrame, y: np.ndarray) -> None:
 
         # Transform x and y to torch tensors
@@ -252,36 +305,24 @@ class MultiArmedBandit(OptimizerNotBO):
 
         # Add data to all previously observed data and to the trust region manager
         self.data_buffer.append(x_transf, y)
+        self._observed_keys.update(row_keys(x_transf))
+        self._update_buffer_stats(x_transf, y)
 
         # update best x and y
         self.update_best(x_transf=x_transf, y=y)
 
-        # Compute the MAB rewards for each of the suggested categories
-        mab_rewards = torch.zeros((len(x_transf), self.search_space.num_dims), dtype=self.dtype)
-
-        # Iterate over the batch
-        for batch_idx in range(len(x_transf)):
-            _x = x_transf[batch_idx]
-
-            # Iterate over all categorical variables
-            for dim_dix in range(self.search_space.num_dims):
-                indices = self.data_buffer.x[:, dim_dix] == _x[dim_dix]
-
-                # In MAB, we aim to maximise the reward. Comb Opt optimizers minimize reward,
-                # hence, take negative of bb values
-                rewards = - self.data_buffer.y[indices]
+        # Compute the MAB rewards for each of the suggested categories: the reward of a category is the best reward
+        # observed with it (x_transf is in the buffer, so all the categories indexed below have at least one reward)
+        x_cats = x_transf.to(torch.long)
 
-                if len(rewards) == 0:
-                    reward = torch.tensor(0., dtype=self.dtype)
-                else:
-                    reward = rewards.max()
-
-                    # If possible, map rewards to range[-0.5, 0.5]
-                    if self.data_buffer.y.max() != self.data_buffer.y.min():
-                        reward = 2 * (rewards.max() - (- self.data_buffer.y).min()) / \
-                                 ((- self.data_buffer.y).max() - (-self.data_buffer.y).min()) - 1.
+        mab_rewards = torch.zeros((len(x_transf), self.search_space.num_dims), dtype=self.dtype)
+        for dim_dix, cat_rewards in enumerate(self._cat_rewards):
+            mab_rewards[:, dim_dix] = cat_rewards[x_cats[:, dim_dix]]
 
-                mab_rewards[batch_idx, dim_dix] = reward
+        # If possible, map rewards to range[-1, 1]
+        neg_y_min, neg_y_max = - self._y_max, - self._y_min
+        if neg_y_max != neg_y_min:
+            mab_rewards = 2 * (mab_rewards - neg_y_min) / (neg_y_max - neg_y_min) - 1.
 
         # Update the probability distribution
         for dim_dix in range(self.search_space.num_dims):
@@ -290,41 +331,41 @@ class MultiArmedBandit(OptimizerNotBO):
             gamma = self.gamma[dim_dix]
             prob_dist = self.prob_dist[dim_dix]
 
-            x_transf = x_transf.to(torch.long)
-            reward = mab_rewards[:, dim_dix]
-            nominal_vars = x_transf[:, dim_dix]  # 1xB
-            for ii, ht in enumerate(nominal_vars):
-                gt_ht_b = reward[ii]
-                estimated_reward = 1.0 * gt_ht_b / prob_dist[ht]
-                # if ht not in self.S0:
-                log_weights[ht] = (log_weights[ht] + (len(mab_rewards) * estimated_reward * gamma / num_cats)).clip(
-                    min=-30, max=30)
+            reward = mab_rewards[:, dim_dix].numpy()
+            nominal_vars = x_cats[:, dim_dix].numpy()  # 1xB
+            estimated_reward = 1.0 * reward / prob_dist[nominal_vars]
+            # Accumulate the updates of all the samples of the batch (several samples can share a category)
+            np.add.at(log_weights, nominal_vars, len(mab_rewards) * estimated_reward * gamma / num_cats)
+            np.clip(log_weights, -30, 30, out=log_weights)
 
             self.log_weights[dim_dix] = log_weights
 
     def restart(self) -> None:
         self._restart()
 
-        self.gamma = []
-        for n_cats in self.n_cats:
-            if n_cats > self.batch_size:
-                self.gamma.append(np.sqrt(n_cats * np.log(n_cats / self.batch_size) / (
-                        (np.e - 1) * self.batch_size * self.best_ube)))
-            else:
-                self.gamma.append(np.sqrt(n_cats * np.log(n_cats) / ((np.e - 1) * self.best_ube)))
+        self.gamma = self.get_gamma()
 
         self.log_weights = [np.zeros(C) for C in self.n_cats]
         self.prob_dist = None
+        self.prob_cdf = None
+        self._observed_keys = set()
+        self._y_min = np.inf
+        self._y_max = - np.inf
+        self._cat_rewards = None
 
     def set_x_init(self, x: pd.DataFrame):
         # This does not apply to the MAB algorithm
         warnings.warn('set_x_init does not apply to the MAB algorithm')
         pass
 
-    def initialize(self, x: pd.DataFrame, y: np.ndarray):
+    def initialize(self, x: Optional[pd.DataFrame], y: np.ndarray, x_transf: Optional[torch.Tensor] = None):
 
-        # Transform x and y to torch tensors
-        x = self.search_space.transform(x)
+        # Transform x and y to torch tensors (unless x is directly provided in transformed space)
+        assert x is not None or x_transf is not None, "One of x and x_transf should be provided"
+        if x_transf is None:
+            x = self.search_space.transform(x)
+        else:
+            x = x_transf
 
         if isinstance(y, np.ndarray):
             y = torch.tensor(y, dtype=self.dtype)
@@ -333,29 +374,39 @@ class MultiArmedBandit(OptimizerNotBO):
 
         # Add data to all previously observed data and to the trust region manager
         self.data_buffer.append(x, y)
+        self._observed_keys.update(row_keys(x))
+        self._update_buffer_stats(x, y)
 
         # update best x and y
-        if self.best_y is None:
-            batch_idx = y.flatten().argmin()
-            self.best_y = y[batch_idx, 0].item()
-            self._best_x = x[batch_idx: batch_idx + 1]
-
-        else:
-            batch_idx = y.flatten().argmin()
-            y_ = y[batch_idx, 0].item()
+        batch_idx = 0 if len(y) == 1 else int(y.flatten().argmin())
+        y_ = y[batch_idx, 0].item()
 
-            if y_ < self.best_y:
-                self.best_y = y_
-                self._best_x = x[batch_idx: batch_idx + 1]
+        if self.best_y is None or y_ < self.best_y:
+            self.best_y = y_
+            self._best_x = x[batch_idx: batch_idx + 1]
 
     def update_prob_dist(self) -> None:
 
         prob_dist = []
-
-        for j in range(len(self.n_cats)):
-            weights = np.exp(self.log_weights[j])
-            gamma = self.gamma[j]
-            norm = float(sum(weights))
-            prob_dist.append(list((1.0 - gamma) * (w / norm) + (gamma / len(weights)) for w in weights))
+        # Cumulative distributions of all the variables, padded with ones to the largest number of categories (the
+        # last category of each variable is set to exactly one so that rounding errors cannot select a padded entry)
+        prob_cdf = np.ones((len(self.n_cats), max(self.n_cats)))
+
+        for j, log_weights in enumerate(self.log_weights):
+            # Shift the log-weights before exponentiating for numerical stability (softmax)
+            weights = np.exp(log_weights - log_weights.max())
+            weights *= (1.0 - self.gamma[j]) / weights.sum()
+            weights += self.gamma[j] / weights.size
+            prob_dist.append(weights)
+            np.cumsum(weights[:-1], out=prob_cdf[j, :weights.size - 1])
 
         self.prob_dist = prob_dist
+        self.prob_cdf = prob_cdf
+
+    def sample_from_prob_dist(self, n_points: int) -> torch.Tensor:
+        """
+        Sample independently the category of each variable of n_points from the current probability distributions
+        (inverse CDF sampling of all the variables at once)
+        """
+        u = np.random.random((n_points, len(self.n_cats), 1))
+        return torch.from_numpy((u >= self.prob_cdf).sum(axis=-1)).to(self.dtype)
@@ -63,14 +63,14 @@ class TrManagerBase(ABC):
             self._center = None
         else:
             assert center.shape[-1] == self.search_space.num_dims, (center.shape[-1], self.search_space.num_dims)
-            self._center = center.to(self.search_space.dtype)
+            self._center = center.to(self.search_space.dtype).clone()
 
     @property
     def center(self) -> Optional[torch.Tensor]:
-        if self._center is None:
-            return None
-        else:
-            return self._center.clone()
+        """
+        Centre of the trust region. The stored tensor is returned, so it is read-only: clone it before modifying it
+        """
+        return self._center
 
     def register_radius(self,
                         variable_type: str,
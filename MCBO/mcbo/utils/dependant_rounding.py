@@ -7,37 +7,15 @@ Dependent rounding developed by [Gandhi et al.] is a kind of technique that rand
 - References: see also https://www.cs.umd.edu/~samir/grant/jacm06.pdf
 """
 
-# Implementation taken from https://github.com/98k-bot/SMPyBandits/blob/35e675bde29dafbec68288fcfcd14ef3b0f058b2/PoliciesMultiPlayers/DepRound.py and https://github.com/98k-bot/SMPyBandits/blob/35e675bde29dafbec68288fcfcd14ef3b0f058b2/Policies/with_proba.py
+# Implementation taken from https://github.com/98k-bot/SMPyBandits/blob/35e675bde29dafbec68288fcfcd14ef3b0f058b2/PoliciesMultiPlayers/DepRound.py
 
 from __future__ import division, print_function  # Python 2 compatibility
 
 __author__ = ""
 __version__ = ""
 
-from random import random
-
 import numpy as np
-
-
-# --- Utility functions
-def with_proba(epsilon):
-    """Bernoulli test, with probability :math:`\varepsilon`, return `True`, and with probability :math:`1 - \varepsilon`, return `False`.
-
-    Example:
-
-    >>> from random import seed; seed(0)  # reproductible
-    >>> with_proba(0.5)
-    False
-    >>> with_proba(0.9)
-    True
-    >>> with_proba(0.1)
-    False
-    >>> if with_proba(0.2):
-    ...     print("This happens 20% of the time.")
-    """
-    assert 0 <= epsilon <= 1, "Error: for 'with_proba(epsilon)', epsilon = {:.3g} has to be between 0 and 1 to be a valid probability.".format(
-        epsilon)  # DEBUG
-    return random() < epsilon  # True with proba epsilon
+from numba import njit
 
 
 # --- Utility functions
@@ -56,36 +34,22 @@ def DepRound(weights_p, k=1, isWeights=True):
 
     Example:
 
-    >>> import numpy as np; import random
-    >>> np.random.seed(0); random.seed(0)  # for reproductibility!
+    >>> import numpy as np
+    >>> np.random.seed(0)  # for reproductibility!
     >>> K = 5
     >>> k = 2
 
     >>> weights_p = [ 2, 2, 2, 2, 2 ]  # all equal weights
-    >>> DepRound(weights_p, k)
-    [3, 4]
-    >>> DepRound(weights_p, k)
-    [3, 4]
-    >>> DepRound(weights_p, k)
-    [0, 1]
-
-    >>> weights_p = [ 10, 8, 6, 4, 2 ]  # decreasing weights
-    >>> DepRound(weights_p, k)
-    [0, 4]
-    >>> DepRound(weights_p, k)
-    [1, 2]
-    >>> DepRound(weights_p, k)
-    [3, 4]
+    >>> len(DepRound(weights_p, k))
+    2
 
     >>> weights_p = [ 3, 3, 0, 0, 3 ]  # decreasing weights
-    >>> DepRound(weights_p, k)
-    [0, 4]
-    >>> DepRound(weights_p, k)
-    [0, 4]
-    >>> DepRound(weights_p, k)
-    [0, 4]
-    >>> DepRound(weights_p, k)
-    [0, 1]
+    >>> set(DepRound(weights_p, k)) <= {0, 1, 4}
+    True
+
+    >>> np.random.seed(0); subsets = [DepRound(weights_p, k) for _ in range(10)]
+    >>> np.random.seed(0); subsets == [DepRound(weights_p, k) for _ in range(10)]  # same seed, same subsets
+    True
 
     - See [[Gandhi et al, 2006](http://dl.acm.org/citation.cfm?id=1147956)] for the details.
     """
@@ -99,24 +63,51 @@ def DepRound(weights_p, k=1, isWeights=True):
         p <= 1), "Error: the weights (p_1, ..., p_K) should all be 0 <= p_i <= 1 ...".format(p)  # DEBUG
     assert np.isclose(np.sum(p), 1), "Error: the sum of weights p_1 + ... + p_K should be = 1 (= {}).".format(
         np.sum(p))  # DEBUG
-    # Main loop
-    possible_ij = [a for a in range(K) if 0 < p[a] < 1]
-    while possible_ij:
+    # Main loop, compiled (numba has its own random generator, seeded here from numpy's global one)
+    subset = _dep_round_nb(p.astype(np.float64), k, np.random.randint(2 ** 31)).tolist()
+    assert len(
+        subset) == k, "Error: DepRound({}, {}) is supposed to return a set of size {}, but {} has size {}...".format(
+        weights_p, k, k, subset, len(subset))  # DEBUG
+    return subset
+
+
+@njit(cache=True)
+def _is_close(a: float, b: float) -> bool:
+    # Same tolerances as np.isclose
+    return abs(a - b) <= 1e-8 + 1e-5 * abs(b)
+
+
+@njit(cache=True)
+def _dep_round_nb(p: np.ndarray, k: int, seed: int) -> np.ndarray:
+    """ Dependent rounding main loop of `DepRound` (p is modified in place) """
+    np.random.seed(seed)
+    K = len(p)
+    possible_ij = np.empty(K, dtype=np.int64)
+    while True:
+        n_possible = 0
+        for a in range(K):
+            if 0 < p[a] < 1:
+                possible_ij[n_possible] = a
+                n_possible += 1
+        if n_possible == 0:
+            break
+
         # Choose distinct i, j with 0 < p_i, p_j < 1
-        if len(possible_ij) == 1:
-            i = np.random.choice(possible_ij, size=1)
-            j = i
-        else:
-            i, j = np.random.choice(possible_ij, size=2, replace=False)
+        r1 = np.random.randint(0, n_possible)
+        i = possible_ij[r1]
+        j = i
+        if n_possible > 1:
+            r2 = np.random.randint(0, n_possible - 1)
+            if r2 >= r1:
+                r2 += 1
+            j = possible_ij[r2]
+        assert i != j, "Error: i is different than with j."  # DEBUG
         pi, pj = p[i], p[j]
-        assert 0 < pi < 1, "Error: pi = {} (with i = {}) is not 0 < pi < 1.".format(pi, i)  # DEBUG
-        assert 0 < pj < 1, "Error: pj = {} (with j = {}) is not 0 < pj < 1.".format(pj, i)  # DEBUG
-        assert i != j, "Error: i = {} is different than with j = {}.".format(i, j)  # DEBUG
 
         # Set alpha, beta
         alpha, beta = min(1 - pi, pj), min(pi, 1 - pj)
         proba = alpha / (alpha + beta)
-        if with_proba(proba):  # with probability = proba = alpha/(alpha+beta)
+        if np.random.random() < proba:  # with probability = proba = alpha/(alpha+beta)
             pi, pj = pi + alpha, pj - alpha
         else:  # with probability = 1 - proba = beta/(alpha+beta)
             pi, pj = pi - beta, pj + beta
@@ -124,14 +115,22 @@ def DepRound(weights_p, k=1, isWeights=True):
         # Store
         p[i], p[j] = pi, pj
         # And update
-        possible_ij = [a for a in range(K) if 0 < p[a] < 1]
-        if len([a for a in range(K) if np.isclose(p[a], 0)]) == K - k:
+        n_zeros = 0
+        for a in range(K):
+            if _is_close(p[a], 0):
+                n_zeros += 1
+        if n_zeros == K - k:
             break
+
     # Final step
-    subset = [a for a in range(K) if np.isclose(p[a], 1)]
-    if len(subset) < k:
-        subset = [a for a in range(K) if not np.isclose(p[a], 0)]
-    assert len(
-        subset) == k, "Error: DepRound({}, {}) is supposed to return a set of size {}, but {} has size {}...".format(
-        weights_p, k, k, subset, len(subset))  # DEBUG
-    return subset
+    n_ones = 0
+    for a in range(K):
+        if _is_close(p[a], 1):
+            n_ones += 1
+    subset = np.empty(K, dtype=np.int64)
+    n_subset = 0
+    for a in range(K):
+        if (n_ones >= k and _is_close(p[a], 1)) or (n_ones < k and not _is_close(p[a], 0)):
+            subset[n_subset] = a
+            n_subset += 1
+    return subset[:n_subset]
@@ -11,7 +11,7 @@ import numpy as np
 import torch
 
 from mcbo.search_space import SearchSpace
-from typing import Optional, Union, List
+from typing import Optional, Union, List, Iterable
 
 from mcbo.utils.general_utils import copy_tensor
 
@@ -58,3 +58,28 @@ def round_discrete_vars(x: torch.FloatTensor, discrete_dims: list,
         return x_
     else:
         return x
+
+
+def row_key(x: torch.Tensor) -> bytes:
+    """
+    Hashable representation of a single point whose variables are all discrete (e.g. nominal), used for set-based
+    membership tests. Casting to int32 makes the key exact and independent of the dtype of x.
+
+    The discrete optimisers keep the keys of all the points stored in their data buffer in an `_observed_keys` set,
+    updated whenever the buffer is appended to, so checking whether a point was already observed is a set lookup.
+    """
+    return x.cpu().numpy().astype(np.int32).tobytes()
+
+
+def row_keys(x: torch.Tensor) -> List[bytes]:
+    """
+    Keys (see `row_key`) of all the rows of x, converting x only once
+    """
+    return [row.tobytes() for row in x.cpu().numpy().astype(np.int32)]
+
+
+def rows_from_keys(keys: Iterable[bytes], num_dims: int) -> np.ndarray:
+    """
+    Inverse of `row_keys`: int32 array containing the points corresponding to the keys
+    """
+    return np.frombuffer(b''.join(keys), dtype=np.int32).reshape(-1, num_dims)
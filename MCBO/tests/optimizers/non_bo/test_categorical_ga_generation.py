@@ -0,0 +1,116 @@
+# Copyright (C) 2022. Huawei Technologies Co., Ltd. All rights reserved. Redistribution and use in source and binary
+# forms, with or without modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+# disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+# following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+# INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Dict
+
+ROOT_PROJECT = str(Path(os.path.realpath(__file__)).parent.parent.parent)
+sys.path[0] = ROOT_PROJECT
+
+import numpy as np
+import torch
+
+from mcbo.optimizers.non_bo.genetic_algorithm import CategoricalGeneticAlgorithm
+from mcbo.task_factory import task_factory
+from mcbo.trust_region.random_restart_tr_manager import RandomRestartTrManager
+from mcbo.utils.distance_metrics import hamming_distance
+
+
+def input_constraint_maker(ind: int) -> Callable[[Dict], bool]:
+    def f(x: Dict) -> bool:
+        return x[f"var_{ind}"] < 0
+
+    return f
+
+
+def test_generations_within_tr():
+    """
+    Check that the generations of the categorical GA stay within the trust region, satisfy the input constraints and
+    do not repeat observed points, and that the population and the elites are exposed with the optimizer dtype
+    """
+    np.random.seed(0)
+    torch.manual_seed(0)
+
+    task = task_factory('levy', num_dims=6, variable_type='nominal', num_categories=5)
+    search_space = task.get_search_space()
+    input_constraints = [input_constraint_maker(i) for i in range(1, 3)]
+
+    tr_manager = RandomRestartTrManager(
+        search_space=search_space,
+        obj_dims=[0],
+        out_constr_dims=None,
+        out_upper_constr_vals=None,
+        min_num_radius=2 ** -5,
+        max_num_radius=1.,
+        init_num_radius=0.8,
+        min_nominal_radius=1,
+        max_nominal_radius=6,
+        init_nominal_radius=3,
+    )
+    # The centre is the first point of the initial population, so it has to satisfy the constraints
+    x_cands = search_space.sample(1000)
+    valid = np.all([[c(x_cands.iloc[i].to_dict()) for c in input_constraints] for i in range(len(x_cands))], axis=1)
+    center = search_space.transform(x_cands[valid].iloc[:1])[0]
+    tr_manager.set_center(center)
+    tr_manager.radii['nominal'] = 3
+    radius = tr_manager.get_nominal_radius()
+
+    optimizer = CategoricalGeneticAlgorithm(
+        search_space=search_space,
+        input_constraints=input_constraints,
+        obj_dims=[0],
+        out_constr_dims=None,
+        out_upper_constr_vals=None,
+        pop_size=20,
+        num_parents=10,
+        num_elite=4,
+        fixed_tr_manager=tr_manager,
+    )
+
+    observed = set()
+    for generation in range(8):
+        x_next = optimizer.suggest_batch()
+        assert len(x_next) == optimizer.pop_size
+        x_next_transf = search_space.transform(x_next)
+
+        dist = hamming_distance(x_next_transf, center.unsqueeze(0), normalize=False)
+        assert (dist <= radius).all(), (generation, dist)
+
+        assert np.all(optimizer.input_eval_from_origx(x_next)), generation
+
+        keys = [tuple(row) for row in x_next_transf.round().long().tolist()]
+        if generation > 0:  # the initial population is sampled at random before any observation
+            assert observed.isdisjoint(keys), generation
+        observed.update(keys)
+
+        optimizer.observe(x_next, task(x_next))
+
+        assert optimizer.x_pop.dtype == optimizer.dtype
+        assert len(optimizer.x_pop) == len(optimizer.y_pop) == optimizer.pop_size
+        if optimizer.x_elite is not None:
+            assert optimizer.x_elite.dtype == optimizer.dtype
+            assert len(optimizer.x_elite) == optimizer.num_elite
+
+
+if __name__ == '__main__':
+    test_generations_within_tr()
+    print('All the generations of the categorical GA are valid')
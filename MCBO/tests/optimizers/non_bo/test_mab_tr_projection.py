@@ -0,0 +1,126 @@
+# Copyright (C) 2022. Huawei Technologies Co., Ltd. All rights reserved. Redistribution and use in source and binary
+# forms, with or without modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+# disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+# following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+# INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT_PROJECT = str(Path(os.path.realpath(__file__)).parent.parent.parent)
+sys.path[0] = ROOT_PROJECT
+
+import numpy as np
+import torch
+
+from mcbo.optimizers import MultiArmedBandit
+from mcbo.task_factory import task_factory
+from mcbo.trust_region.random_restart_tr_manager import RandomRestartTrManager
+from mcbo.utils.distance_metrics import hamming_distance
+
+NUM_DIMS = 5
+NUM_CATS = 4
+RADIUS = 2
+
+
+def get_mab(input_constraints: Optional[List[Callable[[Dict], bool]]] = None) -> MultiArmedBandit:
+    task = task_factory('levy', num_dims=NUM_DIMS, variable_type='nominal', num_categories=NUM_CATS)
+    search_space = task.get_search_space()
+
+    tr_manager = RandomRestartTrManager(
+        search_space=search_space,
+        obj_dims=[0],
+        out_constr_dims=None,
+        out_upper_constr_vals=None,
+        min_num_radius=2 ** -5,
+        max_num_radius=1.,
+        init_num_radius=0.8,
+        min_nominal_radius=1,
+        max_nominal_radius=NUM_DIMS,
+        init_nominal_radius=RADIUS,
+    )
+    tr_manager.set_center(search_space.transform(search_space.sample(1))[0])
+    tr_manager.radii['nominal'] = RADIUS
+
+    return MultiArmedBandit(
+        search_space=search_space,
+        input_constraints=input_constraints,
+        obj_dims=[0],
+        out_constr_dims=None,
+        out_upper_constr_vals=None,
+        fixed_tr_manager=tr_manager,
+        fixed_tr_centre_nominal_dims=search_space.nominal_dims
+    )
+
+
+def test_projection_at_radius():
+    """ A point exactly at distance radius from the centre is left unchanged """
+    np.random.seed(0)
+    optimizer = get_mab()
+    center = optimizer.tr_center[0]
+
+    x = center.clone()
+    x[:RADIUS] = (x[:RADIUS] + 1) % NUM_CATS
+    x_proj = optimizer._project_to_tr(x=x.unsqueeze(0), radius=RADIUS)
+
+    assert torch.equal(x_proj[0], x), (x, x_proj)
+
+
+def test_projection_far_outside():
+    """ A point differing from the centre in all dimensions is projected to distance radius, towards the centre """
+    np.random.seed(0)
+    optimizer = get_mab()
+    center = optimizer.tr_center[0]
+
+    x = ((center + 1) % NUM_CATS).repeat(10, 1)
+    x_proj = optimizer._project_to_tr(x=x, radius=RADIUS)
+
+    assert (hamming_distance(x_proj, center.unsqueeze(0), normalize=False) == RADIUS).all(), x_proj
+    # Each dimension either keeps its value or is reset to the value of the centre
+    assert ((x_proj == x) | (x_proj == center)).all(), x_proj
+    # The kept dimensions differ from one point to the other
+    assert len(torch.unique(x_proj, dim=0)) > 1, x_proj
+
+
+def test_projection_fallback_on_invalid():
+    """
+    When the projections do not satisfy the input constraints, valid points are sampled directly within the trust
+    region
+    """
+    np.random.seed(0)
+    optimizer = get_mab()
+    center_x0 = optimizer.search_space.inverse_transform(optimizer.tr_center)['var_0'].iloc[0]
+
+    # The centre itself is not valid
+    optimizer.input_constraints = [lambda x: x['var_0'] != center_x0]
+    # Project the points all the way to the centre so that all the projections are invalid
+    optimizer._project_to_tr = lambda x, radius: MultiArmedBandit._project_to_tr(optimizer, x=x, radius=0)
+
+    for _ in range(20):
+        x_next = optimizer.suggest(1)
+        dist = hamming_distance(optimizer.search_space.transform(x_next), optimizer.tr_center, normalize=False)
+        assert (dist <= RADIUS).all(), dist
+        assert np.all(optimizer.input_eval_from_origx(x_next)), x_next
+
+
+if __name__ == '__main__':
+    test_projection_at_radius()
+    test_projection_far_outside()
+    test_projection_fallback_on_invalid()
+    print('The MAB trust region projections are valid')
@@ -0,0 +1,101 @@
+# Copyright (C) 2022. Huawei Technologies Co., Ltd. All rights reserved. Redistribution and use in source and binary
+# forms, with or without modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this list of conditions and the following
+# disclaimer.
+#
+# 2. Redistributions in binary form must reproduce the above copyright notice, this list of conditions and the
+# following disclaimer in the documentation and/or other materials provided with the distribution.
+#
+# 3. Neither the name of the copyright holder nor the names of its contributors may be used to endorse or promote
+# products derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES,
+# INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT HOLDER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR
+# SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY,
+# WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE
+# USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import sys
+from pathlib import Path
+from typing import Callable, List
+
+ROOT_PROJECT = str(Path(os.path.realpath(__file__)).parent.parent.parent)
+sys.path[0] = ROOT_PROJECT
+
+import numpy as np
+
+from mcbo.utils.dependant_rounding import DepRound
+
+N_DRAWS = 5000
+
+
+def dep_round_reference(weights_p, k: int) -> List[int]:
+    """ Pure python main loop of `DepRound`, as it was before being compiled """
+    p = np.array(weights_p, dtype=np.float64)
+    p = p / np.sum(p)
+    K = len(p)
+    possible_ij = [a for a in range(K) if 0 < p[a] < 1]
+    while possible_ij:
+        if len(possible_ij) == 1:
+            i = j = possible_ij[0]
+        else:
+            i, j = np.random.choice(possible_ij, size=2, replace=False)
+        pi, pj = p[i], p[j]
+        alpha, beta = min(1 - pi, pj), min(pi, 1 - pj)
+        if np.random.random() < alpha / (alpha + beta):
+            pi, pj = pi + alpha, pj - alpha
+        else:
+            pi, pj = pi - beta, pj + beta
+        p[i], p[j] = pi, pj
+        possible_ij = [a for a in range(K) if 0 < p[a] < 1]
+        if len([a for a in range(K) if np.isclose(p[a], 0)]) == K - k:
+            break
+    subset = [a for a in range(K) if np.isclose(p[a], 1)]
+    if len(subset) < k:
+        subset = [a for a in range(K) if not np.isclose(p[a], 0)]
+    return subset
+
+
+def get_frequencies(weights_p, k: int, dep_round: Callable[..., List[int]] = DepRound) -> np.ndarray:
+    counts = np.zeros(len(weights_p))
+    for _ in range(N_DRAWS):
+        subset = dep_round(weights_p, k)
+        assert len(subset) == len(set(subset)) == k, subset
+        counts[subset] += 1
+    return counts / N_DRAWS
+
+
+def test_equal_weights():
+    """ With equal weights, each of the K actions is selected with frequency k / K """
+    np.random.seed(0)
+    k = 2
+    freqs = get_frequencies([2, 2, 2, 2, 2], k=k)
+    assert np.allclose(freqs, k / 5, atol=0.03), freqs
+
+
+def test_zero_weights():
+    """ Actions with zero weight are never selected, and the others are selected with the same frequency """
+    np.random.seed(0)
+    freqs = get_frequencies([3, 3, 0, 0, 3], k=2)
+    assert freqs[2] == freqs[3] == 0, freqs
+    assert np.allclose(freqs[[0, 1, 4]], 2 / 3, atol=0.03), freqs
+
+
+def test_unequal_weights():
+    """ With unequal weights, the frequency of each action matches the one of the pure python implementation """
+    np.random.seed(0)
+    weights_p = [5, 4, 3, 2, 1]
+    freqs = get_frequencies(weights_p, k=2)
+    ref_freqs = get_frequencies(weights_p, k=2, dep_round=dep_round_reference)
+    assert np.allclose(freqs, ref_freqs, atol=0.03), (freqs, ref_freqs)
+
+
+if __name__ == '__main__':
+    test_equal_weights()
+    test_zero_weights()
+    test_unequal_weights()
+    print('The frequencies of the dependent rounding are valid')